@@ -5,6 +5,8 @@ Compare text extraction performance of different PDF parsers.
 import json
 import os
 import time
+from importlib.metadata import PackageNotFoundError
+from importlib.metadata import version as package_version
 from io import BytesIO
 from itertools import product
 from json import JSONDecodeError
@@ -27,6 +29,7 @@ dotenv.load_dotenv(override=True)
 from pdf_benchmark.data_structures import Cache, Document, Library
 from pdf_benchmark.library_code import (
     borb_get_text,
+    crapdf_get_text,
     pdfium_get_text,
     pdfminer_image_extraction,
     pdfplubmer_get_text,
@@ -189,7 +192,9 @@ if __name__ == "__main__":
             version=pdfminer.__version__,
             license="MIT/X",
             last_release_date="2022-11-05",
-            image_extraction_function=pdfminer_image_extraction,
+            image_extraction_function=lambda n: pdfminer_image_extraction(
+                n, encode_png=True
+            ),
         ),
         "pdfplumber": Library(
             "pdfplumber",
@@ -281,4 +286,18 @@ if __name__ == "__main__":
         #     dependencies="",
         # ),
     }
+    # Optional Rust-based (lopdf) extractor, only benchmarked when installed
+    try:
+        libraries["crapdf"] = Library(
+            "crapdf",
+            "crapdf",
+            "https://pypi.org/project/crapdf/",
+            text_extraction_function=crapdf_get_text,
+            version=package_version("crapdf"),
+            watermarking_function=None,
+            last_release_date="-",
+            dependencies="lopdf (Rust)",
+        )
+    except PackageNotFoundError:
+        pass
     main(docs, libraries)
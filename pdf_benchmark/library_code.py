@@ -1,7 +1,18 @@
+import asyncio
+import inspect
+import math
 import os
 import subprocess
 import tempfile
+import zlib
+from collections import deque
+from collections.abc import Awaitable, Callable, Iterator
+from functools import lru_cache
 from io import BytesIO
+from itertools import chain
+from multiprocessing import Pool
+from typing import TypeVar
+from urllib.parse import urlparse
 
 import fitz as PyMuPDF
 import pdfminer
@@ -10,18 +21,116 @@ import pypdf
 import pypdfium2 as pdfium
 from borb.pdf.pdf import PDF
 from borb.toolkit.text.simple_text_extraction import SimpleTextExtraction
-from pdfminer.high_level import extract_pages
-from requests import ReadTimeout
+from pdfminer.converter import PDFPageAggregator
+from pdfminer.layout import LTPage
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdftypes import (
+    LITERALS_DCT_DECODE,
+    LITERALS_JBIG2_DECODE,
+    LITERALS_JPX_DECODE,
+    resolve1,
+)
+from pdfminer.psparser import PSLiteral
+from pypdf.generic import ContentStream, EncodedStreamObject, NameObject
+from requests import ReadTimeout, Session
 
 from .text_extraction_post_processing import PDFIUM_ZERO_WIDTH_NO_BREAK_SPACE
 
 
+# Each extractor parses the document itself, exactly once per call, and reuses
+# it for the page count and the serial path. Parsed documents are deliberately
+# not cached across calls: every benchmark timing has to include its own parse,
+# independent of which benchmarks ran before on the same bytes.
+#
+# BytesIO(data) does not copy data: CPython shares the bytes buffer until the
+# stream is written to, so wrapping the input per call is cheap for every
+# library that needs a stream.
+
+
+def _page_ranges(page_count: int, nb_chunks: int) -> list[tuple[int, int]]:
+    """Split range(page_count) into at most nb_chunks contiguous (lo, hi) ranges."""
+    if page_count == 0:
+        return []
+    segment = math.ceil(page_count / nb_chunks)
+    return [(lo, min(lo + segment, page_count)) for lo in range(0, page_count, segment)]
+
+
+def _process_page_ranges(
+    worker: Callable[[tuple[bytes, int, int]], str | list],
+    data: bytes,
+    page_count: int,
+) -> Iterator:
+    """
+    Run worker over contiguous page ranges in a process pool.
+
+    Documents are not picklable, so each worker receives the raw bytes and
+    re-opens the PDF itself. Results are yielded in page order, as soon as
+    the range they belong to is done. Pool.imap has no back-pressure: the
+    result of every finished range stays in memory until it is consumed.
+    """
+    jobs = [(data, lo, hi) for lo, hi in _page_ranges(page_count, os.cpu_count() or 1)]
+    if len(jobs) <= 1:
+        # Nothing to run in parallel, so do not pay for a pool
+        yield from map(worker, jobs)
+        return
+    with Pool(len(jobs)) as pool:
+        yield from pool.imap(worker, jobs)
+
+
+def _report_image_extraction_failure(
+    library_name: str, images: Iterator[tuple[str, bytes]]
+) -> Iterator[tuple[str, bytes]]:
+    """Yield from images, stopping with a message on the first error."""
+    try:
+        yield from images
+    except Exception as exc:
+        print(f"{library_name} Image extraction failure: {exc}")
+
+
+T = TypeVar("T")
+
+# Up to this many pages the process pool start-up and the re-parse in every
+# worker cost more than they save. Native libraries (MuPDF, PDFium) handle a
+# page in well under a millisecond, so they only switch for very large
+# documents; pure-Python libraries are slow enough per page to switch early.
+SERIAL_MAX_PAGES = 200
+PURE_PYTHON_SERIAL_MAX_PAGES = 10
+
+
+def _dispatch(
+    func_serial: Callable[[], T],
+    func_process: Callable[[], T],
+    page_count: int,
+    serial_max_pages: int = SERIAL_MAX_PAGES,
+) -> T:
+    """Run small documents serially and larger ones in a process pool."""
+    if page_count <= serial_max_pages:
+        return func_serial()
+    return func_process()
+
+
+def _pymupdf_pages_text(doc: PyMuPDF.Document, lo: int, hi: int) -> str:
+    return "".join(doc[i].get_text() + "\n" for i in range(lo, hi))
+
+
+def _pymupdf_extract_range(args: tuple[bytes, int, int]) -> str:
+    data, lo, hi = args
+    with PyMuPDF.open(stream=data, filetype="pdf") as doc:
+        return _pymupdf_pages_text(doc, lo, hi)
+
+
 def pymupdf_get_text(data: bytes) -> str:
     with PyMuPDF.open(stream=data, filetype="pdf") as doc:
-        text = ""
-        for page in doc:
-            text += page.get_text() + "\n"
-    return text
+        page_count = doc.page_count
+        # PyMuPDF is not thread-safe, so pages are sharded across processes
+        return _dispatch(
+            lambda: _pymupdf_pages_text(doc, 0, page_count),
+            lambda: "".join(
+                _process_page_ranges(_pymupdf_extract_range, data, page_count)
+            ),
+            page_count,
+        )
 
 
 def pypdf_get_text(data: bytes) -> str:
@@ -37,34 +146,73 @@ def pdfium_new_line_after_hyphens(text):
     return text.replace(PDFIUM_ZERO_WIDTH_NO_BREAK_SPACE, PDFIUM_ZERO_WIDTH_NO_BREAK_SPACE + '\n')
 
 
-def pdfium_get_text(data: bytes) -> str:
+def _pdfium_pages_text(pdf: pdfium.PdfDocument, lo: int, hi: int) -> str:
     texts = []
-    pdf = pdfium.PdfDocument(data)
+    for i in range(lo, hi):
+        page = pdf.get_page(i)
+        textpage = page.get_textpage()
+        texts.append(textpage.get_text_range())
+    return "\n".join(texts)
 
+
+def _pdfium_extract_range(args: tuple[bytes, int, int]) -> str:
+    data, lo, hi = args
+    return _pdfium_pages_text(pdfium.PdfDocument(data), lo, hi)
+
+
+def pdfium_get_text(data: bytes) -> str:
+    pdf = pdfium.PdfDocument(data)
+    page_count = len(pdf)
+    # PDFium is not thread-safe either, so use processes rather than threads
+    text = _dispatch(
+        lambda: _pdfium_pages_text(pdf, 0, page_count),
+        lambda: "\n".join(
+            _process_page_ranges(_pdfium_extract_range, data, page_count)
+        ),
+        page_count,
+    )
+    # A single pass over the whole document instead of one per page
+    return pdfium_new_line_after_hyphens(text)
+
+
+def pdfium_iter_images(data: bytes) -> Iterator[tuple[str, bytes]]:
+    pdf = pdfium.PdfDocument(data)
     for i in range(len(pdf)):
         page = pdf.get_page(i)
-        textpage = page.get_textpage()
-        texts.append(pdfium_new_line_after_hyphens(textpage.get_text_range()))
-    text = "\n".join(texts)
-    return text
+        index = 1
+        for obj in page.get_objects():
+            if isinstance(obj, pdfium.PdfImage):
+                img = BytesIO()
+                obj.extract(img)
+                yield f"page-{i + 1}-image-{index}.jpg", img.getvalue()
+                index += 1
 
 
 def pdfium_image_extraction(data: bytes) -> list[tuple[str, bytes]]:
-    images = []
-    try:
-        pdf = pdfium.PdfDocument(data)
-        for i in range(len(pdf)):
-            page = pdf.get_page(i)
-            index = 1
-            for obj in page.get_objects():
-                if isinstance(obj, pdfium.PdfImage):
-                    img = BytesIO()
-                    obj.extract(img)
-                    images.append((f"page-{i + 1}-image-{index}.jpg", img.getvalue()))
-                    index += 1
-    except Exception as exc:
-        print(f"pdfium Image extraction failure: {exc}")
-    return images
+    return list(_report_image_extraction_failure("pdfium", pdfium_iter_images(data)))
+
+
+# zlib level 1 is several times faster than the default level 6 and the
+# resulting PDF is only around 5% larger.
+PYPDF_COMPRESSION_LEVEL = 1
+_PYPDF_COMPRESS_HAS_LEVEL = (
+    "level" in inspect.signature(pypdf.PageObject.compress_content_streams).parameters
+)
+
+
+def _pypdf_compress_content_streams(page: pypdf.PageObject) -> None:
+    if _PYPDF_COMPRESS_HAS_LEVEL:
+        page.compress_content_streams(level=PYPDF_COMPRESSION_LEVEL)
+        return
+    # Older pypdf versions always use the default zlib level
+    content = page.get_contents()
+    if content is not None:
+        if not isinstance(content, ContentStream):
+            content = ContentStream(content, page.pdf)
+        encoded = EncodedStreamObject()
+        encoded[NameObject("/Filter")] = NameObject("/FlateDecode")
+        encoded._data = zlib.compress(content.get_data(), PYPDF_COMPRESSION_LEVEL)
+        page[NameObject("/Contents")] = encoded
 
 
 def pypdf_watermarking(watermark_data: bytes, data: bytes) -> bytes:
@@ -78,43 +226,84 @@ def pypdf_watermarking(watermark_data: bytes, data: bytes) -> bytes:
         page.merge_page(watermark_page)
         writer.add_page(page)
 
-    # Compress the data
+    # Compress the data. This is CPU intensive! Most of the time goes into
+    # parsing and re-serialising the content streams in pure Python (holding
+    # the GIL), not into zlib, so threads would not help here.
     for page in writer.pages:
-        page.compress_content_streams()  # This is CPU intensive!
+        _pypdf_compress_content_streams(page)
 
     # Write it back
     with BytesIO() as bytes_stream:
         writer.write(bytes_stream)
-        bytes_stream.seek(0)
-        return bytes_stream.read()
+        return bytes_stream.getvalue()
+
+
+def _pypdf_pages_images(
+    reader: pypdf.PdfReader, lo: int, hi: int
+) -> Iterator[tuple[str, bytes]]:
+    for page_index in range(lo, hi):
+        for image in reader.pages[page_index].images:
+            yield image.name, image.data
+
+
+def _pypdf_extract_images_range(
+    args: tuple[bytes, int, int]
+) -> list[tuple[str, bytes]]:
+    data, lo, hi = args
+    return list(_pypdf_pages_images(pypdf.PdfReader(BytesIO(data)), lo, hi))
+
+
+def pypdf_iter_images(data: bytes) -> Iterator[tuple[str, bytes]]:
+    reader = pypdf.PdfReader(BytesIO(data))
+    page_count = len(reader.pages)
+    yield from _dispatch(
+        lambda: _pypdf_pages_images(reader, 0, page_count),
+        lambda: chain.from_iterable(
+            _process_page_ranges(_pypdf_extract_images_range, data, page_count)
+        ),
+        page_count,
+    )
 
 
 def pypdf_image_extraction(data: bytes) -> list[tuple[str, bytes]]:
-    images = []
-    try:
-        reader = pypdf.PdfReader(BytesIO(data))
-        for page in reader.pages:
-            for image in page.images:
-                images.append((image.name, image.data))
-    except Exception as exc:
-        print(f"pypdf Image extraction failure: {exc}")
-    return images
+    return list(_report_image_extraction_failure("pypdf", pypdf_iter_images(data)))
+
+
+def _pymupdf_pages_images(
+    pdf_file: PyMuPDF.Document, lo: int, hi: int
+) -> Iterator[tuple[str, bytes]]:
+    for page_index in range(lo, hi):
+        page = pdf_file[page_index]
+        for image_index, img in enumerate(page.get_images(), start=1):
+            xref = img[0]
+            base_image = pdf_file.extract_image(xref)
+            image_bytes = base_image["image"]
+            image_ext = base_image["ext"]
+            yield f"image{page_index + 1}_{image_index}.{image_ext}", image_bytes
+
+
+def _pymupdf_extract_images_range(
+    args: tuple[bytes, int, int]
+) -> list[tuple[str, bytes]]:
+    data, lo, hi = args
+    with PyMuPDF.open(stream=data, filetype="pdf") as pdf_file:
+        return list(_pymupdf_pages_images(pdf_file, lo, hi))
 
 
-def pymupdf_image_extraction(data: bytes) -> list[tuple[str, bytes]]:
-    images = []
+def pymupdf_iter_images(data: bytes) -> Iterator[tuple[str, bytes]]:
     with PyMuPDF.open(stream=data, filetype="pdf") as pdf_file:
-        for page_index in range(len(pdf_file)):
-            page = pdf_file[page_index]
-            for image_index, img in enumerate(page.get_images(), start=1):
-                xref = img[0]
-                base_image = pdf_file.extract_image(xref)
-                image_bytes = base_image["image"]
-                image_ext = base_image["ext"]
-                images.append(
-                    (f"image{page_index + 1}_{image_index}.{image_ext}", image_bytes)
-                )
-    return images
+        page_count = pdf_file.page_count
+        yield from _dispatch(
+            lambda: _pymupdf_pages_images(pdf_file, 0, page_count),
+            lambda: chain.from_iterable(
+                _process_page_ranges(_pymupdf_extract_images_range, data, page_count)
+            ),
+            page_count,
+        )
+
+
+def pymupdf_image_extraction(data: bytes) -> list[tuple[str, bytes]]:
+    return list(pymupdf_iter_images(data))
 
 
 def pymupdf_watermarking(watermark_data: bytes, data: bytes) -> bytes:
@@ -137,123 +326,348 @@ def pymupdf_watermarking(watermark_data: bytes, data: bytes) -> bytes:
     return pdf_file.write()
 
 
-def pdfminer_image_extraction(data: bytes) -> list[tuple[str, bytes]]:
-    from PIL import Image
+def _pdfminer_pages_without_layout_analysis(data: bytes) -> Iterator[LTPage]:
+    """
+    Yield the LTPage of every page without running pdfminer's layout analysis.
+
+    extract_pages() always groups characters into lines and text boxes, which
+    is the pure-Python hot loop of pdfminer and is useless when only the
+    images are needed.
+    """
+    resource_manager = PDFResourceManager(caching=True)
+    device = PDFPageAggregator(resource_manager, laparams=None)
+    interpreter = PDFPageInterpreter(resource_manager, device)
+    for page in PDFPage.get_pages(BytesIO(data), caching=True):
+        interpreter.process_page(page)
+        yield device.get_result()
+
+
+# pdfminer leaves these streams encoded, so get_data() is already a complete
+# image file in that format
+PDFMINER_PASSTHROUGH_IMAGE_EXTENSIONS = {
+    **{name: "jpg" for name in LITERALS_DCT_DECODE},
+    **{name: "jp2" for name in LITERALS_JPX_DECODE},
+    **{name: "jb2" for name in LITERALS_JBIG2_DECODE},
+}
+
+# PIL modes for 8-bit images, by PDF colour space name and by the number of
+# components of an ICC-based colour space
+PDFMINER_PIL_MODES = {
+    "DeviceGray": "L",
+    "CalGray": "L",
+    "DeviceRGB": "RGB",
+    "CalRGB": "RGB",
+    "DeviceCMYK": "CMYK",
+}
+PDFMINER_ICC_PIL_MODES = {1: "L", 3: "RGB", 4: "CMYK"}
+
+
+def _pdfminer_pil_mode(image: pdfminer.layout.LTImage) -> str | None:
+    """Return the PIL mode of the decoded image data, None if unsupported."""
+    if image.bits == 1:
+        return "1"
+    if image.bits != 8:
+        return None
+    colorspace = [resolve1(component) for component in image.colorspace]
+    if len(colorspace) == 1 and isinstance(colorspace[0], list):
+        colorspace = [resolve1(component) for component in colorspace[0]]
+    if not colorspace or not isinstance(colorspace[0], PSLiteral):
+        return None
+    if colorspace[0].name == "ICCBased" and len(colorspace) > 1:
+        return PDFMINER_ICC_PIL_MODES.get(resolve1(colorspace[1]).get("N"))
+    return PDFMINER_PIL_MODES.get(colorspace[0].name)
+
+
+def pdfminer_iter_images(
+    data: bytes, encode_png: bool = False
+) -> Iterator[tuple[str, bytes]]:
+    """
+    Extract the images with pdfminer.six.
+
+    JPEG, JPEG 2000 and JBIG2 streams are returned as they are stored in the
+    PDF. By default, 1-bit bitmaps are returned undecoded as
+    "<name>-<width>x<height>-1bpp.raw" files. 8-bit Gray, RGB and CMYK
+    images, and the 1-bit ones when encode_png=True, are encoded as PNG.
+    Images in any other format are returned undecoded as
+    "<name>-<width>x<height>-<bits>bpc.raw" files.
+    """
+
+    def iter_images(root):
+        # Walk the whole layout tree: images can sit at any depth, and not
+        # only below the first child of a container
+        stack = deque([root])
+        while stack:
+            layout_object = stack.popleft()
+            if isinstance(layout_object, pdfminer.layout.LTImage):
+                yield layout_object
+            elif isinstance(layout_object, pdfminer.layout.LTContainer):
+                stack.extend(layout_object)
+
+    for page in _pdfminer_pages_without_layout_analysis(data):
+        for image in iter_images(page):
+            filters = image.stream.get_filters()
+            last_filter = filters[-1][0] if filters else None
+            if last_filter in PDFMINER_PASSTHROUGH_IMAGE_EXTENSIONS:
+                extension = PDFMINER_PASSTHROUGH_IMAGE_EXTENSIONS[last_filter]
+                yield f"{image.name}.{extension}", image.stream.get_data()
+                continue
+            width, height = image.srcsize
+            if image.bits == 1 and not encode_png:
+                name = f"{image.name}-{width}x{height}-1bpp.raw"
+                yield name, image.stream.get_data()
+                continue
+            mode = _pdfminer_pil_mode(image)
+            if mode is None:
+                name = f"{image.name}-{width}x{height}-{image.bits}bpc.raw"
+                yield name, image.stream.get_data()
+                continue
+
+            from PIL import Image
+
+            image_pil = Image.frombytes(
+                mode, image.srcsize, image.stream.get_data(), "raw"
+            )
+            if mode == "CMYK":
+                # PNG has no CMYK support
+                image_pil = image_pil.convert("RGB")
+
+            img_byte_arr = BytesIO()
+            # Deflate dominates the encoding time, level 1 trades a little size
+            # for a lot of speed
+            image_pil.save(img_byte_arr, format="PNG", compress_level=1, optimize=False)
+            img_byte_arr = img_byte_arr.getvalue()
+
+            yield f"{image.name}.png", img_byte_arr
+
+
+def pdfminer_image_extraction(
+    data: bytes, encode_png: bool = False
+) -> list[tuple[str, bytes]]:
+    return list(
+        _report_image_extraction_failure(
+            "pdfminer", pdfminer_iter_images(data, encode_png)
+        )
+    )
 
-    def get_image(layout_object):
-        if isinstance(layout_object, pdfminer.layout.LTImage):
-            return layout_object
-        if isinstance(layout_object, pdfminer.layout.LTContainer):
-            for child in layout_object:
-                return get_image(child)
-        else:
-            return None
 
-    images = []
-    try:
-        pages = list(extract_pages(BytesIO(data)))
-        for page in pages:
-            ex_images = list(filter(bool, map(get_image, page)))
-            for image in ex_images:
-                image_pil = Image.frombytes(
-                    "1", image.srcsize, image.stream.get_data(), "raw"
-                )
-
-                img_byte_arr = BytesIO()
-                image_pil.save(img_byte_arr, format="PNG")
-                img_byte_arr = img_byte_arr.getvalue()
-
-                images.append((f"{image.name}.png", img_byte_arr))
-    except Exception as exc:
-        print(f"pdfminer Image extraction failure: {exc}")
-    return images
+def crapdf_get_text(data: bytes) -> str:
+    from crapdf import extract_bytes
+
+    return "\n".join(extract_bytes(data))
 
 
 def borb_get_text(data: bytes) -> str:
-    text = ""
+    texts = []
     try:
         ste = SimpleTextExtraction()
         PDF.loads(BytesIO(data), [ste])
         obj = ste.get_text()
         for page_index in range(len(obj)):
-            text += obj[page_index]
+            texts.append(obj[page_index])
     except Exception as exc:
         print(exc)
-    return text
+    return "".join(texts)
+
+
+def _pdfplumber_pages_text(pdf: pdfplumber.PDF, lo: int, hi: int) -> str:
+    texts = []
+    for page in pdf.pages[lo:hi]:
+        texts.append(page.extract_text())
+        texts.append("\n")
+    return "".join(texts)
+
+
+def _pdfplumber_extract_range(args: tuple[bytes, int, int]) -> str:
+    data, lo, hi = args
+    with pdfplumber.open(BytesIO(data)) as pdf:
+        return _pdfplumber_pages_text(pdf, lo, hi)
 
 
 def pdfplubmer_get_text(data: bytes) -> str:
-    text = ""
     with pdfplumber.open(BytesIO(data)) as pdf:
-        for page in pdf.pages:
-            text += page.extract_text()
-            text += "\n"
-    return text
+        page_count = len(pdf.pages)
+        # pdfplumber is pure Python, so only processes can run pages in parallel
+        return _dispatch(
+            lambda: _pdfplumber_pages_text(pdf, 0, page_count),
+            lambda: "".join(
+                _process_page_ranges(_pdfplumber_extract_range, data, page_count)
+            ),
+            page_count,
+            PURE_PYTHON_SERIAL_MAX_PAGES,
+        )
 
 
-def pdftotext_get_text(data: bytes) -> str:
-    new_file, filename = tempfile.mkstemp()
-    with open(filename, "wb") as fp:
-        fp.write(data)
+XSLTPROC_PATH = "/usr/bin/xsltproc"
+ALTO_TO_TEXT_XSL = "resources/pdfalto/alto2txt.xsl"
+PDFALTO_TEXT_OPTIONS = ["-noImageInline", "-fullFontName", "-noImage", "-readingOrder"]
+
+
+def _pdftotext_executable() -> str:
     pdf_to_text_path = "/usr/bin/pdftotext"
     if not os.path.exists(pdf_to_text_path):
-        pdf_to_text_path = 'pdftotext'
-    args = [pdf_to_text_path, "-enc", "UTF-8", filename, "-"]
-    res = subprocess.run(args, capture_output=True)
+        pdf_to_text_path = "pdftotext"
+    return pdf_to_text_path
+
+
+def _pdfalto_executable() -> str:
+    pdf_to_text_path = os.environ.get("PDFALTO_EXECUTABLE")
+    if not (pdf_to_text_path and os.path.exists(pdf_to_text_path)):
+        print(
+            "To evaluate pdfalto, you need to create a .env file and place it at the root directory"
+        )
+        pdf_to_text_path = "pdfalto"
+    return pdf_to_text_path
+
+
+# Stage the input PDFs of the command line tools on tmpfs when available, so
+# they never have to reach the disk
+TEMP_PDF_DIRECTORY = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+
+def _write_temp_pdf(data: bytes) -> tuple[int, str]:
+    """Write data to a new temporary file through the descriptor from mkstemp."""
+    new_file, filename = tempfile.mkstemp(dir=TEMP_PDF_DIRECTORY)
+    view = memoryview(data)
+    while view:
+        view = view[os.write(new_file, view) :]
+    return new_file, filename
+
+
+async def _gather_limited(
+    run: Callable[[bytes], Awaitable[str]], datas: list[bytes]
+) -> list[str]:
+    """Run one coroutine per document, at most cpu_count() at a time."""
+    semaphore = asyncio.Semaphore(os.cpu_count() or 1)
+
+    async def limited(data: bytes) -> str:
+        async with semaphore:
+            return await run(data)
+
+    return await asyncio.gather(*(limited(data) for data in datas))
+
+
+def pdftotext_get_text(data: bytes) -> str:
+    # "-" as input file makes pdftotext read the PDF from stdin
+    args = [_pdftotext_executable(), "-enc", "UTF-8", "-", "-"]
+    res = subprocess.run(args, input=data, capture_output=True)
     output = res.stdout.decode("utf-8")
-    os.close(new_file)
-    os.remove(filename)
     return output
 
 
+async def _run_pdftotext(data: bytes) -> str:
+    process = await asyncio.create_subprocess_exec(
+        _pdftotext_executable(),
+        "-enc",
+        "UTF-8",
+        "-",
+        "-",
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    stdout, _ = await process.communicate(data)
+    return stdout.decode("utf-8")
+
+
+def pdftotext_get_text_batch(datas: list[bytes]) -> list[str]:
+    """Extract the text of many PDFs with concurrent pdftotext processes."""
+    return asyncio.run(_gather_limited(_run_pdftotext, datas))
+
+
 def pdfalto_get_text(data: bytes) -> str:
-    new_file, filename = tempfile.mkstemp()
-    with open(filename, "wb") as fp:
-        fp.write(data)
-    pdf_to_text_path = os.environ["PDFALTO_EXECUTABLE"] if "PDFALTO_EXECUTABLE" in os.environ else None
-    if not (pdf_to_text_path or os.path.exists(pdf_to_text_path)):
-        print("To evaluate pdfalto, you need to create a .env file and place it at the root directory")
-        pdf_to_text_path = 'pdfalto'
-    args = [pdf_to_text_path, "-noImageInline", "-fullFontName", "-noImage", "-readingOrder", filename, "-"]
-
-    res = subprocess.run(args, capture_output=True)
-    output_xml = res.stdout.decode("utf-8")
-    new_file_xml, filename_xml = tempfile.mkstemp()
-    with open(filename_xml, "w") as fp:
-        fp.write(output_xml)
-    xml_to_txt_path = "/usr/bin/xsltproc"
-    args = [xml_to_txt_path, "resources/pdfalto/alto2txt.xsl", filename_xml]
-    res = subprocess.run(args, capture_output=True)
-    output = res.stdout.decode("utf-8")
-    os.close(new_file)
-    os.close(new_file_xml)
-    os.remove(filename)
-    os.remove(filename_xml)
+    new_file, filename = _write_temp_pdf(data)
+    pdfalto = None
+    try:
+        args = [_pdfalto_executable(), *PDFALTO_TEXT_OPTIONS, filename, "-"]
+
+        # Stream the ALTO XML from pdfalto straight into xsltproc
+        pdfalto = subprocess.Popen(
+            args, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        args = [XSLTPROC_PATH, ALTO_TO_TEXT_XSL, "-"]
+        xsltproc = subprocess.Popen(
+            args,
+            stdin=pdfalto.stdout,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        # Let pdfalto receive SIGPIPE if xsltproc exits early
+        pdfalto.stdout.close()
+        output = xsltproc.communicate()[0].decode("utf-8")
+        pdfalto.wait()
+    finally:
+        if pdfalto is not None:
+            # Only still running if starting or reading xsltproc failed
+            if pdfalto.poll() is None:
+                pdfalto.kill()
+            pdfalto.stdout.close()
+            pdfalto.wait()
+        os.close(new_file)
+        os.remove(filename)
     return output
 
+
+async def _run_pdfalto(data: bytes) -> str:
+    new_file, filename = _write_temp_pdf(data)
+    read_end, write_end = os.pipe()
+    open_ends = [read_end, write_end]
+    pdfalto = None
+    try:
+        pdfalto = await asyncio.create_subprocess_exec(
+            _pdfalto_executable(),
+            *PDFALTO_TEXT_OPTIONS,
+            filename,
+            "-",
+            stdout=write_end,
+            stderr=subprocess.DEVNULL,
+        )
+        os.close(write_end)
+        open_ends.remove(write_end)
+        xsltproc = await asyncio.create_subprocess_exec(
+            XSLTPROC_PATH,
+            ALTO_TO_TEXT_XSL,
+            "-",
+            stdin=read_end,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        os.close(read_end)
+        open_ends.remove(read_end)
+        stdout, _ = await xsltproc.communicate()
+        await pdfalto.wait()
+    finally:
+        for end in open_ends:
+            os.close(end)
+        if pdfalto is not None and pdfalto.returncode is None:
+            pdfalto.kill()
+            await pdfalto.wait()
+        os.close(new_file)
+        os.remove(filename)
+    return stdout.decode("utf-8")
+
+
+def pdfalto_get_text_batch(datas: list[bytes]) -> list[str]:
+    """Extract the text of many PDFs with concurrent pdfalto processes."""
+    return asyncio.run(_gather_limited(_run_pdfalto, datas))
+
+
+def pdfalto_iter_images(data: bytes) -> Iterator[tuple[str, bytes]]:
+    new_file, filename = _write_temp_pdf(data)
+    try:
+        output_directory = tempfile.TemporaryDirectory()
+        args = [_pdfalto_executable(), filename, output_directory.name]
+        subprocess.run(args, capture_output=True)
+        output_image_directory = f"{output_directory.name}_data"
+        for image in os.listdir(output_image_directory):
+            with open(os.path.join(output_image_directory, image), "rb") as fp:
+                yield image, fp.read()
+    finally:
+        os.close(new_file)
+        os.remove(filename)
+
+
 def pdfalto_get_images(data: bytes) -> list[tuple[str, bytes]]:
-    images = []
-    new_file, filename = tempfile.mkstemp()
-
-    with open(filename, "wb") as fp:
-        fp.write(data)
-    pdf_to_text_path = os.environ["PDFALTO_EXECUTABLE"] if "PDFALTO_EXECUTABLE" in os.environ else None
-
-    if not (pdf_to_text_path or os.path.exists(pdf_to_text_path)):
-        print("To evaluate pdfalto, you need to create a .env file and place it at the root directory")
-        pdf_to_text_path = 'pdfalto'
-
-    output_directory = tempfile.TemporaryDirectory()
-    args = [pdf_to_text_path, filename, output_directory.name]
-    subprocess.run(args, capture_output=True)
-    output_image_directory = f"{output_directory.name}_data"
-    for idx, image in enumerate(os.listdir(output_image_directory)):
-        with open(os.path.join(output_image_directory, image), "rb") as fp:
-            images.append((image, fp.read()))
-
-    os.close(new_file)
-    os.remove(filename)
-    return images
+    return list(pdfalto_iter_images(data))
 #
 # def pdfalto_v05_get_text(data: bytes) -> str:
 #     new_file, filename = tempfile.mkstemp()
@@ -292,17 +706,36 @@ def pdfrw_watermarking(watermark_data: bytes, data: bytes) -> bytes:
         PageMerge(page).add(wmark, prepend=False).render()
     PdfWriter(out_buffer, trailer=trailer).write()
 
-    out_buffer.seek(0)
-    return out_buffer.read()
+    return out_buffer.getvalue()
 
 
-def tika_get_text(data: bytes) -> str:
-    from tika import parser
+_tika_session = Session()
 
+
+@lru_cache(maxsize=None)
+def _tika_server_endpoint() -> str:
+    """Make sure the Tika server is running (once) and return its endpoint."""
+    from tika import tika
+
+    if tika.TikaClientOnly:
+        return tika.ServerEndpoint
+    endpoint = urlparse(tika.ServerEndpoint)
+    return tika.checkTikaServer(endpoint.scheme, endpoint.hostname, endpoint.port)
+
+
+def tika_get_text(data: bytes) -> str:
+    # Talk to the long-running server directly over a keep-alive session
+    # instead of letting tika-python set up a new connection for every call
     try:
-        return parser.from_buffer(BytesIO(data), requestOptions={"timeout": (1, 100)})[
-            "content"
-        ]
+        response = _tika_session.put(
+            f"{_tika_server_endpoint()}/tika",
+            data=data,
+            headers={"Accept": "text/plain"},
+            timeout=(1, 100),
+        )
     except ReadTimeout as ex:
         print("Tika timeout:", ex)
         return "[[[Tika text extraction failed!]]]"
+    response.raise_for_status()
+    response.encoding = "utf-8"
+    return response.text